@@ -5,23 +5,47 @@ import json
 import requests
 import warnings
 import xml.etree.ElementTree as etree
-from os.path import realpath, abspath, dirname, isfile, join
+from os import chmod, remove, replace
+from os.path import realpath, abspath, dirname, isfile, join, getmtime
+from tempfile import mkstemp
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from json.decoder import JSONDecodeError
 from argparse import ArgumentParser
 from netCDF4 import Dataset, numpy
 from netrc import netrc
 
+try:
+    import orjson  # Optional; much faster (de)serialization for CMR requests
+except ImportError:
+    orjson = None
+
+try:
+    import fastjsonschema  # Optional; only needed to --validate records
+except ImportError:
+    fastjsonschema = None
+
 # Ignore deprecation warnings raised innocuously by numpy in netCDF4 ->
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 _cmr = "cmr.earthdata.nasa.gov"
 
+# Share keep-alive connections to Earthdata across all requests the script 
+# makes, including the concurrent variable PUTs to CMR ->
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=32, max_retries=Retry(
+        total=3, backoff_factor=0.5, raise_on_status=False,
+        status_forcelist=[429, 500, 502, 503, 504])))
+
 def _get_lptoken(cert: str, **kwargs) -> str:
     with open(cert, "r") as f:
         try:
             data = json.load(f)
         except json.decoder.JSONDecodeError as e:
-            raise "Could not obtain Launchpad token!"
+            raise Exception("Could not obtain Launchpad token!")
     return data.get("token")
 
 def _get_edltoken(urs: str, **kwargs) -> str:
@@ -29,9 +53,9 @@ def _get_edltoken(urs: str, **kwargs) -> str:
     username, _, password = netrc().authenticators(urs)
     auth = requests.auth.HTTPBasicAuth(username, password)
     try:
-        tokens = requests.get(f"{url}/tokens", auth=auth).json()
+        tokens = _session.get(f"{url}/tokens", auth=auth).json()
         if len(tokens)==0:
-            tokens = [requests.post(f"{url}/token", auth=auth).json()]
+            tokens = [_session.post(f"{url}/token", auth=auth).json()]
     except IndexError as e:
         raise Exception("Could not obtain EDL token!")
     else:
@@ -47,50 +71,131 @@ def _get_token(**kwargs) -> str:
             cert = cert.replace("ops.json", f"{env}.json")
     return _get_edltoken(urs) if not isfile(cert) else _get_lptoken(cert)
 
-# https://cfconventions.org/Data/cf-standard-names/current/src/cf-standard-name-table.xml
-_cf_names = join(abspath(dirname(realpath(__file__))), "resources/cf-standard-name-table.xml")
+_resources = join(abspath(dirname(realpath(__file__))), "resources")
 
-def _read_cfnames(xml: str=_cf_names):
-    cf_standard_names = dict()
+def _cache_json(data, path: str):
+    """Write data to a json cache file in resources/, if it is writable. The 
+    file is written beside the cache and then renamed over it, so readers 
+    never see a partially written cache."""
+    tmp = None
     try:
-        with open(xml, "r", encoding="utf8") as f:
-            xml = etree.fromstring(f.read())  #xml = f.read()
-    except FileNotFoundError as e:
-        raise e
-    else:
-        for n in xml.findall("entry"):
-            cf_standard_names[n.items()[0][1]] = dict()
-            for t in n.findall("*"):
-                cf_standard_names[t.tag] = str(t.text)
+        fd, tmp = mkstemp(dir=dirname(path), suffix=".tmp")
+        with open(fd, "w", encoding="utf8") as f:
+            json.dump(data, f)
+        chmod(tmp, 0o644)  # mkstemp creates 0600; caches must be world-readable
+        replace(tmp, path)
+    except OSError as e:
+        # Read-only install; the data is still used for the current run.
+        warnings.warn(f"Could not write cache file '{path}': {e}")
+        if tmp is not None and isfile(tmp):
+            remove(tmp)
+    return data
+
+def _load_json(path: str):
+    """Read a json cache file; None if it is corrupt, so it gets rebuilt."""
+    try:
+        with open(path, "r", encoding="utf8") as f:
+            return json.load(f)
+    except ValueError as e:  # JSONDecodeError, UnicodeDecodeError
+        warnings.warn(f"Rebuilding unreadable cache file '{path}': {e}")
+        return None
+
+# https://cfconventions.org/Data/cf-standard-names/current/src/cf-standard-name-table.xml
+_cf_names_xml = join(_resources, "cf-standard-name-table.xml")
+_cf_names = join(_resources, "cf-standard-names.json")
+
+def _parse_cfnames(xml: str=_cf_names_xml):
+    """Map each CF standard name to its description (the only field that is 
+    reported) from the source xml table. This only runs when the json cache 
+    is missing or older than the xml. The table is streamed, clearing each 
+    entry once read, so the full tree is never held in memory."""
+    cf_standard_names = dict()
+    for _, elem in etree.iterparse(xml, events=("end",)):
+        if elem.tag=="entry":
+            desc = elem.findtext("description")
+            if desc:  # Skip names with an empty <description/>, e.g. 'time'
+                cf_standard_names[elem.get("id")] = desc
+            elem.clear()
+        elif elem.tag=="alias":
+            elem.clear()
     return cf_standard_names
 
+@lru_cache(maxsize=None)
+def _read_cfnames(path: str=_cf_names, xml: str=_cf_names_xml):
+    if isfile(path) and (not isfile(xml) or getmtime(path)>=getmtime(xml)):
+        cf_standard_names = _load_json(path)
+        if cf_standard_names is not None:
+            return cf_standard_names
+    return _cache_json(_parse_cfnames(xml), path)
 
-_umm_var = "https://cdn.earthdata.nasa.gov/umm/variable/v1.8.1"
 
-def _read_schema(url: str=f"{_umm_var}/umm-var-json-schema.json"):
+_umm_var = "https://cdn.earthdata.nasa.gov/umm/variable/v1.8.1"
+_umm_version = _umm_var.rsplit("/v", 1)[-1]
+_metadata_spec = {"URL": _umm_var, "Name": "UMM-Var", "Version": _umm_version}
+_umm_schema = join(_resources, "umm-var-json-schema.json")
+_schemas = {}  # Schemas read or downloaded during this run, keyed by path
+
+def _fetch_schema(path: str=_umm_schema):
+    """Download the UMM-Var json schema and refresh the local copy. The 
+    download is used for this run even if the local copy can't be written."""
+    url = f"{_umm_var}/umm-var-json-schema.json"
     try:
-        with requests.get(url) as response:
-            return response.json()
+        with _session.get(url) as response:
+            response.raise_for_status()  # Retries don't raise on their own
+            schema = response.json()
     except JSONDecodeError as e:
         raise e
+    if not isinstance(schema, dict) or 'properties' not in schema:
+        raise Exception(f"Response from '{url}' is not a UMM-Var json schema. Abort")
+    _schemas[path] = _cache_json(schema, path)
+    return _schemas[path]
 
+def _read_schema(path: str=_umm_schema):
+    if path not in _schemas:
+        schema = _load_json(path) if isfile(path) else None
+        if not isinstance(schema, dict) or 'properties' not in schema:
+            return _fetch_schema(path)
+        _schemas[path] = schema
+    return _schemas[path]
 
-def convert(o):
+
+class UMMEncoder(json.JSONEncoder):
     """Encode manually if np type doesn't serialize to JSON."""
-    if isinstance(o, numpy.ndarray):
-        return o.tolist()
-    elif isinstance(o, str):
-        return o.replace('"', "'")  # Replace escaped quotes in strings.
-    elif isinstance(o, numpy.generic):
-        if o.__class__.__name__.startswith("float"):
-            return float(str(o))  # Protect against float precision errors
-        return o.item()
-    else:
-        return o
+    def default(self, o):
+        if isinstance(o, numpy.ndarray):
+            return o.tolist()
+        elif isinstance(o, numpy.generic):
+            if o.__class__.__name__.startswith("float"):
+                return float(str(o))  # Protect against float precision errors
+            return o.item()
+        return super().default(o)
+
+_encoder = UMMEncoder(ensure_ascii=False)
+
+
+def _dumps(o, indent: bool=False) -> bytes:
+    """Serialize to UTF-8 JSON bytes with orjson if available; otherwise json. 
+    Both leave non-ASCII characters unescaped, so their output matches. Send 
+    the bytes as-is; a str request body is encoded as Latin-1 by http.client."""
+    if orjson is None:
+        if indent:
+            return json.dumps(o, indent=2, ensure_ascii=False, cls=UMMEncoder).encode("utf8")
+        return _encoder.encode(o).encode("utf8")
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(o, default=_encoder.default, option=option)
+
+
+def _loads(response):
+    """Deserialize the JSON body of a requests response."""
+    return response.json() if orjson is None else orjson.loads(response.content)
 
 
 def _txt_sanitize(d):
     if type(d) is numpy.ndarray:
+        if d.ndim==1 and numpy.issubdtype(d.dtype, numpy.integer):
+            return " ".join(map(str, d.tolist()))  # Skip the '<U' temp array
         return " ".join(d.astype(str))
     elif type(d) is list:
         return " ".join([str(i) for i in d])
@@ -119,24 +224,64 @@ __datatypes__  = {
     "<class 'netCDF4._netCDF4.CompoundType'>:": "NC_UBYTE",
 }
 
+# UMM-compatible datatype strings, keyed by numpy dtype code for the common 
+# case and by string prefix for netCDF4 VLType/CompoundType variables ->
+_dtypes_fast = {k: v[3:].lower() for k, v in __datatypes__.items() if len(k)==2}
+_dtypes_prefix = tuple((k, v[3:].lower()) for k, v in __datatypes__.items() if len(k)!=2)
+
+
+# CF flag attributes reported as AdditionalIdentifiers, in reporting order ->
+_cf_flags = (
+    ("flag_values", "CF_Flag_Values"),
+    ("flag_meanings", "CF_Flag_Meanings"),
+    ("flag_masks", "CF_Flag_Masks"),
+)
+_cf_identifier_keys = frozenset([a for a, _ in _cf_flags] + ["standard_name"])
+
+# UMM VariableType for each CF 'coverage_content_type' (including typos) ->
+_variable_types = {
+    'image': "SCIENCE_VARIABLE",
+    'thematicClassification': "SCIENCE_VARIABLE",
+    'physicalMeasurement': "SCIENCE_VARIABLE",
+    'modelResult': "SCIENCE_VARIABLE",
+    'auxiliaryInformation': "ANCILLARY_VARIABLE",
+    'auxillaryInformation': "ANCILLARY_VARIABLE",  # common typo
+    'auxilliaryData': "ANCILLARY_VARIABLE",  # cygnss typo
+    'qualityInformation': "QUALITY_VARIABLE",
+    'qualityInformaion': "QUALITY_VARIABLE",  # smode typo
+    'reference_information': "OTHER",  # smode type
+    'referenceInformation': "OTHER",
+    'coordinate': "COORDINATE", 
+}
 
-class Variable:
-    schema = _read_schema()
-    cfnames = _read_cfnames()
+# (group, sanitized path) keyed by id(group). Holding the group keeps its id 
+# from being reused while cached; process_granule clears it on exit ->
+_group_paths = {}
+
+def _group_path(group) -> str:
+    """Prefix of the UMM 'Name' for variables in group: its path with spaces 
+    replaced by underscores, plus '/'; empty at the dataset root, whose 
+    variables have no leading forward-slash."""
+    cached = _group_paths.get(id(group))
+    if cached is None or cached[0] is not group:
+        p = group.path.replace(" ","_")
+        cached = _group_paths[id(group)] = (group, "" if p=="/" else f"{p}/")
+    return cached[1]
 
-    def _Name(ncvar):
+
+class Variable:
+    def _Name(ncvar, attrs):
         """Name is the full path to the variable in the file. But variables 
         at the dataset root should not have a leading forward-slash '/'"""
-        p = ncvar.group().path.replace(" ","_")
-        return ncvar.name if p=="/" else f"{p}/{ncvar.name}"
+        return _group_path(ncvar.group()) + ncvar.name
 
-    def _StandardName(ncvar):
+    def _StandardName(ncvar, attrs):
         """StandardName is the 'standard_name' attribute of the variable, if 
         it exists."""
-        if hasattr(ncvar, "standard_name"):
-            return ncvar.standard_name
+        if "standard_name" in attrs:
+            return ncvar.getncattr("standard_name")
 
-    def _AdditionalIdentifiers(ncvar):
+    def _AdditionalIdentifiers(ncvar, attrs):
         """AdditionalIdentifiers can be any information that doesn't have a 
         place elsewhere in the UMM Variable format, but that we want/need
         to report *consistently* within a UMM Variable record.
@@ -146,76 +291,61 @@ class Variable:
         with a corresponding description in the CF Standard Names table for 
         version xx (default: 76)
         """
+        if attrs.isdisjoint(_cf_identifier_keys):
+            return  # Most variables have none of these attributes
         ai = []
         try:
             # Try to identify CF standard attributes for flags:
-            if hasattr(ncvar, "flag_values"):
-                ai.append({'Identifier': "CF_Flag_Values",
-                           'Description': _txt_sanitize(ncvar.flag_values)})
-            if hasattr(ncvar, "flag_meanings"):
-                ai.append({'Identifier': "CF_Flag_Meanings",
-                           'Description': _txt_sanitize(ncvar.flag_meanings)})
-            if hasattr(ncvar, "flag_masks"):
-                ai.append({'Identifier': "CF_Flag_Masks",
-                           'Description': _txt_sanitize(ncvar.flag_masks)})
+            for attribute, identifier in _cf_flags:
+                if attribute in attrs:
+                    ai.append({'Identifier': identifier,
+                               'Description': _txt_sanitize(ncvar.getncattr(attribute))})
         except Exception as e:
             pass
-        if hasattr(ncvar, "standard_name"):
-            cfname = ncvar.standard_name 
-            try:
-                desc = Variable.cfnames[cfname]['description']
-                if desc is not None:
-                    ai.append({"Identifier": "CF_Standard_Description", 
-                               "Description": desc})
-            except (AttributeError, KeyError) as e:
-                pass
+        if "standard_name" in attrs:
+            cfname = ncvar.getncattr("standard_name")
+            desc = _read_cfnames().get(cfname)
+            if desc:
+                ai.append({"Identifier": "CF_Standard_Description", 
+                           "Description": desc})
         return None if len(ai)==0 else ai
 
-    def _LongName(ncvar):
+    def _LongName(ncvar, attrs):
         """LongName comes from the variable 'long_name' attribute.
 
         Revisions:
           - 20210913: 'LongName' is a required field. Use 'Name' as fallback.
         
         """
-        if hasattr(ncvar, "long_name"):
-            return ncvar.long_name
+        if "long_name" in attrs:
+            return ncvar.getncattr("long_name")
         else:
-            return Variable._Name(ncvar)
+            return Variable._Name(ncvar, attrs)
 
-    def _Definition(ncvar):
+    def _Definition(ncvar, attrs):
         """Fall back on variable 'long_name'; otherwise use its name"""
         for attribute in ['description', 'comment', 'long_name', ]:
-            if hasattr(ncvar, attribute):
-                return getattr(ncvar, attribute)
+            if attribute in attrs:
+                return ncvar.getncattr(attribute)
         return str(ncvar.name)
 
-    def _Units(ncvar):
-        if hasattr(ncvar, "units"):
-            return ncvar.units
+    def _Units(ncvar, attrs):
+        if "units" in attrs:
+            return ncvar.getncattr("units")
 
-    def _DataType(ncvar):
+    def _DataType(ncvar, attrs):
         """unidata.ucar.edu/software/netcdf/docs/netcdf_utilities_guide.html"""
-        try:
-            dtype_str = ncvar.datatype.str[1:]
-        except AttributeError as e:
-            #return __datatypes__[ncvar.datatype.__str__()]
-            for type_name, type_code in __datatypes__.items():
-                if str(ncvar.datatype).startswith(type_name):
-                    return type_code[3:].lower()
-        else:
-            try:
-                # Select and return UMM-compatible datatype string from dict
-                return __datatypes__[dtype_str][3:].lower()
-            except KeyError as e:
-                raise e  # Occurs when no matching datatype string in dict
-            except IndexError as e:
-                raise e  # Occurs when datatype string does not exist
-            except Exception as e:
-                raise e  # Raised when uncovered bug occurs
-        
-
-    def _Dimensions(ncvar):
+        datatype = ncvar.datatype
+        if hasattr(datatype, "str"):
+            # Select and return UMM-compatible datatype string from dict
+            return _dtypes_fast[datatype.str[1:]]  # KeyError if no match
+        # VLType/CompoundType have no numpy dtype string; match their repr
+        datatype = str(datatype)
+        for type_name, type_code in _dtypes_prefix:
+            if datatype.startswith(type_name):
+                return type_code
+
+    def _Dimensions(ncvar, attrs):
         def _predict_dim_type(dim):
             """Unused: (PRESSURE_DIMENSION,HEIGHT_DIMENSION,DEPTH_DIMENSION)"""
             name = dim.name.lower()
@@ -236,68 +366,60 @@ class Variable:
             return {'Name': dim.name, 'Size': dim.size, 'Type': _type}
         return [_predict_dim_type(d) for d in ncvar.get_dims()]
 
-    def _ValidRanges(ncvar):
+    def _ValidRanges(ncvar, attrs):
         #if hasattr(ncvar, 'valid_range'):
         #    _min, _max = ncvar.valid_range
         #elif hasattr(ncvar, 'valid_min') and hasattr(ncvar, 'valid_max'):
-        if hasattr(ncvar, 'valid_min') and hasattr(ncvar, 'valid_max'):
-            _min, _max = ncvar.valid_min, ncvar.valid_max
+        if 'valid_min' in attrs and 'valid_max' in attrs:
+            _min, _max = ncvar.getncattr('valid_min'), ncvar.getncattr('valid_max')
         else:
             return None
         return [{"Min": _min, "Max": _max}]
 
-    def _Scale(ncvar, default: float=1.0):
-        if hasattr(ncvar, 'scale_factor'):
-            return ncvar.scale_factor
+    def _Scale(ncvar, attrs, default: float=1.0):
+        if 'scale_factor' in attrs:
+            return ncvar.getncattr('scale_factor')
         return default
 
-    def _Offset(ncvar, default: float=0.0):
-        if hasattr(ncvar, 'add_offset'):
-            return ncvar.add_offset
+    def _Offset(ncvar, attrs, default: float=0.0):
+        if 'add_offset' in attrs:
+            return ncvar.getncattr('add_offset')
         return default
 
-    def _FillValues(ncvar):
-        if str(ncvar.name).lower()=="time":
+    def _FillValues(ncvar, attrs):
+        if ncvar.name.lower()=="time":
             return
-        for attribute in ["_FillValue", "missing_value"]:
-            if hasattr(ncvar, attribute):
-                value = getattr(ncvar, attribute)
-                if str(value)=="nan":
-                    pass
+        for attribute in ("_FillValue", "missing_value"):
+            if attribute in attrs:
+                value = ncvar.getncattr(attribute)
+                if isinstance(value, (float, numpy.floating)) and value!=value:
+                    pass  # NaN
                 elif type(value)==bytes:
                     pass
                 else:
                     return [{'Value': value, 'Type': "SCIENCE_FILLVALUE"}]
         return
 
-    def _VariableType(ncvar):
-        if not hasattr(ncvar, "coverage_content_type"):
+    def _VariableType(ncvar, attrs):
+        if "coverage_content_type" not in attrs:
             return
-        return {
-            'image': "SCIENCE_VARIABLE",
-            'thematicClassification': "SCIENCE_VARIABLE",
-            'physicalMeasurement': "SCIENCE_VARIABLE",
-            'modelResult': "SCIENCE_VARIABLE",
-            'auxiliaryInformation': "ANCILLARY_VARIABLE",
-            'auxillaryInformation': "ANCILLARY_VARIABLE",  # common typo
-            'auxilliaryData': "ANCILLARY_VARIABLE",  # cygnss typo
-            'qualityInformation': "QUALITY_VARIABLE",
-            'qualityInformaion': "QUALITY_VARIABLE",  # smode typo
-            'reference_information': "OTHER",  # smode type
-            'referenceInformation': "OTHER",
-            'coordinate': "COORDINATE", 
-        }[ str(ncvar.coverage_content_type).strip() ]
-
-    def _VariableSubType(ncvar):
+        cct = ncvar.getncattr("coverage_content_type")
+        if isinstance(cct, bytes):
+            cct = cct.decode()
+        elif not isinstance(cct, str):
+            cct = str(cct)
+        return _variable_types.get(cct.strip())  # None if unrecognized
+
+    def _VariableSubType(ncvar, attrs):
         """Unused: (SCIENCE_SCALAR, SCIENCE_VECTOR, SCIENCE_ARRAY)"""
-        if any([a.startswith("flag") for a in ncvar.ncattrs()]):
+        if any(a[:4]=="flag" for a in attrs):
             return "SCIENCE_EVENTFLAG"
-        elif Variable._DataType(ncvar)=="char":
+        elif Variable._DataType(ncvar, attrs)=="char":
             return "OTHER"
         else:
             return
 
-    def _IndexRanges(ncvar):
+    def _IndexRanges(ncvar, attrs):
         grp = ncvar.group()
         if grp.parent:
             grp = grp.parent
@@ -317,22 +439,20 @@ class Variable:
                 IndexRanges['LonRange'].append(r)
             return IndexRanges
 
-    def _MeasurementIdentifiers(ncvar):
+    def _MeasurementIdentifiers(ncvar, attrs):
         return
 
-    def _MetadataSpecification(ncvar):
+    def _MetadataSpecification(ncvar, attrs):
         """Added to schema in UMM Variable version 1.8"""
-        return {"URL": _umm_var,
-                "Name": "UMM-Var",
-                "Version": _umm_var.split("/v")[-1]}
+        return _metadata_spec  # Shared by all records; don't mutate
 
-    def _SamplingIdentifiers(ncvar):
+    def _SamplingIdentifiers(ncvar, attrs):
         return
 
-    def _ScienceKeywords(ncvar):
+    def _ScienceKeywords(ncvar, attrs):
         return
 
-    def _Sets(ncvar):
+    def _Sets(ncvar, attrs):
         """Typically, science variables have quality variables associated 
         with them and can also include other types. This element allows for 
         variables to be grouped together as a set. The set is defined by the 
@@ -349,49 +469,78 @@ class Variable:
         return [{'Name': ncvar.name, 'Type': "General", 'Size': 1, 'Index': 1}]
 
 
-class Record:
-    def __init__(self, profile):
-        self.profile = profile
-        self.meta = {}
+@lru_cache(maxsize=None)
+def _profile(profile=Variable):
+    """Resolve the (property, method) pairs for the schema properties that 
+    the profile implements, in schema order, once per run."""
+    return tuple((p, getattr(profile, f"_{p}")) 
+                 for p in _read_schema()['properties'] 
+                 if hasattr(profile, f"_{p}"))
 
-    def fill(self, data, prop: str):
-        if not hasattr(self.profile, f"_{prop}"):
-            return
-        value = getattr(self.profile, f"_{prop}")(data)
-        if value:
-            self.meta[prop] = value
+
+@lru_cache(maxsize=None)
+def _validator():
+    """Compile the UMM-Var schema into a validation function, once per run."""
+    return fastjsonschema.compile(_read_schema())
 
 
 def process_variable(ncvar):
-    record = Record(profile=Variable)
-    for p in Variable.schema['properties']:
-        record.fill(data=ncvar, prop=p)
-    return record.meta
-
-
-def process_granule(ncfile: str):
-    def _ncgrp(x, records: list=[]):
-        groups = x.groups
-        for group in list(groups):
-            records = _ncgrp(groups[group], records=records)
-        variables = x.variables
-        for variable in variables:
-            records.append(process_variable(variables[variable]))
-        return records
+    meta = {}
+    attrs = frozenset(ncvar.ncattrs())  # Probe attributes once per variable
+    for p, method in _profile():
+        value = method(ncvar, attrs)
+        if value:
+            meta[p] = value
+    return meta
+
+
+def _iter_vars(root, name_filter: str=None):
+    """Yield every variable in root and its subgroups from one flat walk. If 
+    name_filter is given, yield only the variable with that UMM 'Name'."""
+    # Walk the group tree with a stack instead of recursion. Reversing the 
+    # visit order lists subgroups (in order) before their parent.
+    groups, stack = [], [root]
+    while stack:
+        group = stack.pop()
+        groups.append(group)
+        stack.extend(group.groups.values())
+    for group in reversed(groups):
+        if name_filter is None:
+            yield from group.variables.values()
+            continue
+        # Match the group path first, as Variable._Name would build it
+        prefix = _group_path(group)
+        if name_filter.startswith(prefix):
+            variable = group.variables.get(name_filter[len(prefix):])
+            if variable is not None:
+                yield variable
+                return  # Names are unique; skip the rest of the walk
+
+
+def process_granule(ncfile: str, name_filter: str=None):
     try:
         with Dataset(ncfile, mode="r") as ds:
-            records = _ncgrp(ds)
+            _group_paths.clear()
+            records = [process_variable(v) for v in _iter_vars(ds, name_filter)]
     except OSError as e:
         raise e
+    finally:
+        _group_paths.clear()  # Don't outlive the granule's groups
     return records
 
 
-def main(granule:str, collection:str=None, variable:str=None, environment:str=None):
-    ummv = process_granule(granule)
+def main(granule:str, collection:str=None, variable:str=None, environment:str=None, refresh_schema:bool=False, validate:bool=False):
+    if validate and collection is None:
+        raise Exception("Validating records only applies when ingesting them to a 'collection' (-c). Abort")
+    if validate and fastjsonschema is None:
+        raise Exception("Validating records requires the 'fastjsonschema' package. Abort")
+    if refresh_schema:
+        _fetch_schema()
+        _profile.cache_clear()
+        _validator.cache_clear()
 
     # If input 'variable' was provided, exclude all other variables.
-    if variable:
-        ummv = [m for m in ummv if m['Name']==variable]
+    ummv = process_granule(granule, name_filter=variable or None)
 
     # If target 'collection' was not provided, return ummvar records to stdout.
     if collection is None:
@@ -407,26 +556,39 @@ def main(granule:str, collection:str=None, variable:str=None, environment:str=No
     else:
         _cmr = "cmr.earthdata.nasa.gov"
 
-    with requests.get(
+    with _session.get(
         url=f"https://{_cmr}/search/concepts/{collection}.umm_json", 
         headers={'Authorization': str(cmr_token)}) as r:
-            ShortName = r.json().get("ShortName")
+            ShortName = _loads(r).get("ShortName")
     if ShortName is None:
         raise Exception(f"Couldnt find collection matching the input concept-id '{collection}'. Abort")
 
-    ingest_log = {}
-    for m in ummv:
+    headers = {
+        'Authorization': str(cmr_token),
+        'Content-type': f"application/vnd.nasa.cmr.umm+json;version={_umm_version}",
+        'Accept': "application/json",
+    }
+
+    def _ingest(m):
         name = m['Name']
         if name.startswith("/"):
             name = name[1:].replace("/","_")
         nid = f"{ShortName}-{name}"
         ingest_url = f"https://{_cmr}/ingest/collections/{collection}/variables/{nid}"
-        ingest_data = json.dumps(m,  default=convert, )
-        ingest_log[nid] = requests.put(ingest_url, data=ingest_data, headers={
-            'Authorization': str(cmr_token),
-            'Content-type': f"application/vnd.nasa.cmr.umm+json;version={_umm_var.split('/v')[-1]}",
-            'Accept': "application/json",
-        }).json()
+        ingest_data = _dumps(m)
+        if validate:
+            # Validate the serialized record, as CMR will receive it:
+            try:
+                _validator()(json.loads(ingest_data))
+            except fastjsonschema.JsonSchemaValueException as e:
+                return nid, {'errors': [f"Failed schema validation: {e.message}"]}
+        return nid, _loads(_session.put(ingest_url, data=ingest_data, headers=headers))
+
+    if validate:
+        _validator()  # Compile once, before the worker threads start
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        ingest_log = dict(executor.map(_ingest, ummv))
 
     return ingest_log
 
@@ -438,6 +600,8 @@ def _handle_args():
     parser.add_argument("-c", "--collection",  dest="collection",  default=None, help="target 'collection' in CMR, specified by its unique 'concept-id'")
     parser.add_argument("-v", "--variable",    dest="variable",    default=None, help="target 'variable' in the input 'granule', which must a netCDF or HDF file")
     parser.add_argument("-e", "--environment", dest="environment", default="ops", help="target CMR environment, if not the 'ops' environment; either 'uat' or 'sit'")
+    parser.add_argument("--validate",          dest="validate",    action="store_true", help="validate records against the UMM-Var json schema and skip ingest of invalid ones; requires '--collection' and fastjsonschema")
+    parser.add_argument("--refresh-schema",    dest="refresh_schema", action="store_true", help="download the UMM-Var json schema again, replacing the local copy in resources/")
     return parser.parse_args()
 
 
@@ -447,6 +611,8 @@ if __name__ == "__main__":
     results = main(granule=args.granule, 
                    collection=args.collection,
                    variable=args.variable, 
-                   environment=args.environment, )
+                   environment=args.environment, 
+                   refresh_schema=args.refresh_schema, 
+                   validate=args.validate, )
 
-    print(json.dumps(results, indent=2, default=convert, ))
+    print(_dumps(results, indent=True).decode("utf8"))